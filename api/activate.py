@@ -4,6 +4,13 @@
 from http.server import BaseHTTPRequestHandler
 import json
 import os
+import time
+
+from app.services.devices import (
+    add_device, device_log_id, has_device, hash_device_id, merge_devices
+)
+from app.services.license_status import project_license
+from app.services.resilience import CircuitOpenError, DeadlineExceeded, store_call
 
 class handler(BaseHTTPRequestHandler):
     def _set_headers(self, status_code=200):
@@ -49,7 +56,16 @@ class handler(BaseHTTPRequestHandler):
                     'error': 'Invalid license key format'
                 }, 400)
             
-            print(f"[Activate] Key: {key}, Device: {device_id}")
+            # Only the keyed fingerprint is stored or logged, never the raw id
+            if not os.environ.get("DEVICE_HASH_SECRET"):
+                print("[Activate] ERROR: DEVICE_HASH_SECRET not set")
+                return self._send_json({
+                    'error': 'Server configuration error'
+                }, 500)
+            
+            device_hash = hash_device_id(device_id)
+            
+            print(f"[Activate] Key: {key}, Device: {device_log_id(device_hash)}")
             
             # Get Supabase credentials from environment
             SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -74,7 +90,9 @@ class handler(BaseHTTPRequestHandler):
             supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
             
             # 1. Look up license in database
-            response = supabase.table('licenses').select('*').eq('license_key', key).execute()
+            response = store_call(
+                lambda: supabase.table('licenses').select('*').eq('license_key', key).execute()
+            )
             
             if not response.data or len(response.data) == 0:
                 print(f"[Activate] Key not found: {key}")
@@ -84,22 +102,39 @@ class handler(BaseHTTPRequestHandler):
             
             license_record = response.data[0]
             
+            # Expiry is flagged by the scheduled sweep (api/expiry_sweep.py);
+            # the epoch compare covers licenses that lapsed since the last run.
+            # Rows the status backfill hasn't reached yet are projected here.
+            if license_record.get('seats_used') is None:
+                license_record.update(project_license(license_record))
+            expires_at = license_record.get('expires_at')
+            if license_record.get('status') == 'expired' or (
+                expires_at is not None and expires_at <= time.time()
+            ):
+                print(f"[Activate] License expired: {key}")
+                return self._send_json({
+                    'error': 'License has expired',
+                    'expiry_date': license_record.get('expiry_date')
+                }, 403)
+            
             # 2. Get license details
             is_activated = license_record.get('is_activated', False)
             device_limit = license_record.get('device_limit', 1)
             activation_count = license_record.get('activation_count', 0)
             
-            # 3. Get current activated devices
-            activated_devices = license_record.get('activated_devices', [])
-            if activated_devices is None:
-                activated_devices = []
+            # 3. Get current activated devices (sorted fingerprints; legacy raw
+            # ids still in activated_devices are hashed and moved on the next update)
+            activated_devices = merge_devices(
+                license_record.get('device_fingerprints'),
+                license_record.get('activated_devices')
+            )
             
-            print(f"[Activate] Current devices: {activated_devices}")
+            print(f"[Activate] Current devices: {len(activated_devices)}")
             print(f"[Activate] Device limit: {device_limit}")
             
             # 4. Check if this device is already activated
-            if device_id in activated_devices:
-                print(f"[Activate] Device already activated: {device_id}")
+            if has_device(activated_devices, device_hash):
+                print(f"[Activate] Device already activated: {device_log_id(device_hash)}")
                 return self._send_json({
                     'success': True,
                     'message': 'Device already activated',
@@ -118,12 +153,13 @@ class handler(BaseHTTPRequestHandler):
                 }, 409)
             
             # 6. Add device to license
-            activated_devices.append(device_id)
+            add_device(activated_devices, device_hash)
             
             # Update database
             from datetime import datetime
             update_data = {
-                'activated_devices': activated_devices,
+                'device_fingerprints': activated_devices,
+                'activated_devices': [],
                 'is_activated': True,
                 'activation_count': activation_count + 1
             }
@@ -132,9 +168,11 @@ class handler(BaseHTTPRequestHandler):
             if not is_activated:
                 update_data['activated_at'] = datetime.utcnow().isoformat()
             
-            supabase.table('licenses').update(update_data).eq('license_key', key).execute()
+            store_call(
+                lambda: supabase.table('licenses').update(update_data).eq('license_key', key).execute()
+            )
             
-            print(f"[Activate] Device activated successfully: {device_id}")
+            print(f"[Activate] Device activated successfully: {device_log_id(device_hash)}")
             print(f"[Activate] Total devices for key {key}: {len(activated_devices)}")
             
             return self._send_json({
@@ -157,6 +195,12 @@ class handler(BaseHTTPRequestHandler):
                 'error': 'Invalid JSON in request body'
             }, 400)
         
+        except (CircuitOpenError, DeadlineExceeded) as e:
+            print(f"[Activate] Store unavailable: {e}")
+            return self._send_json({
+                'error': 'License service temporarily unavailable'
+            }, 503)
+        
         except Exception as e:
             print(f"[Activate] Error: {e}")
             import traceback
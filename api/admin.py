@@ -0,0 +1 @@
+from app.main import app
@@ -0,0 +1,45 @@
+# /api/expiry_sweep.py
+# Scheduled expiry sweep - run hourly by the Vercel Cron entry in vercel.json.
+# Each run handles at most SWEEP_MAX_PAGES pages per pass; the rest wait for
+# the next run.
+
+from http.server import BaseHTTPRequestHandler
+import hmac
+import json
+import os
+
+class handler(BaseHTTPRequestHandler):
+    def _send_json(self, data, status_code=200):
+        """Send JSON response"""
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode())
+    
+    def do_GET(self):
+        try:
+            # Vercel Cron sends "Authorization: Bearer <CRON_SECRET>"
+            cron_secret = os.environ.get("CRON_SECRET")
+            auth_header = self.headers.get('Authorization', '')
+            # Compare bytes: str compare_digest raises on non-ASCII input
+            if not cron_secret or not hmac.compare_digest(
+                auth_header.encode('utf-8'), f"Bearer {cron_secret}".encode('utf-8')
+            ):
+                print("[ExpirySweep] Unauthorized")
+                return self._send_json({'error': 'Unauthorized'}, 401)
+            
+            from app.services.expiry import run_expiry_sweep
+            
+            result = run_expiry_sweep()
+            print(f"[ExpirySweep] Expired: {result['expired']}, reminders sent: {result['reminders_sent']}")
+            
+            return self._send_json({'success': True, **result}, 200)
+            
+        except Exception as e:
+            print(f"[ExpirySweep] Error: {e}")
+            import traceback
+            traceback.print_exc()
+            return self._send_json({
+                'error': 'Internal server error',
+                'detail': str(e)
+            }, 500)
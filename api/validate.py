@@ -1,92 +1,139 @@
 # /api/validate.py
-# SIMPLE TEST VERSION - Replace with database version for production
+# Standalone version - reads the precomputed license status projection
 
 from http.server import BaseHTTPRequestHandler
 import json
+import os
+import time
+
+from app.services.license_status import BASE_COLUMNS, project_license
+from app.services.resilience import CircuitOpenError, DeadlineExceeded, cached_read
+
+# Columns maintained by the licenses_refresh_status trigger, plus created_at
+STATUS_COLUMNS = 'status, seats_used, seats_max, expires_at, created_at'
+
+# Prebuilt response bodies; only the per-license numbers are filled in
+VALID_TEMPLATE = (
+    '{{"valid": true, "key": {key}, "status": "{status}", '
+    '"devicesUsed": {seats_used}, "maxDevices": {seats_max}, "expiresAt": {expires_at}, '
+    '"createdAt": {created_at}}}'
+)
+EXPIRED_TEMPLATE = (
+    '{{"valid": false, "error": "License has expired", "key": {key}, "expiresAt": {expires_at}}}'
+)
+MISSING_KEY_BODY = b'{"error": "License key is required"}'
+INVALID_FORMAT_BODY = b'{"error": "Invalid license key format"}'
+NOT_FOUND_BODY = b'{"error": "License key not found", "detail": "Not Found"}'
+CONFIG_ERROR_BODY = b'{"error": "Database configuration error"}'
+UNAVAILABLE_BODY = b'{"error": "License service temporarily unavailable"}'
+METHOD_NOT_ALLOWED_BODY = b'{"error": "Method not allowed"}'
+
+# Reused across warm invocations
+_supabase_client = None
+
+
+def get_supabase_client():
+    global _supabase_client
+    
+    if _supabase_client is None:
+        from supabase import create_client
+        
+        SUPABASE_URL = os.environ.get("SUPABASE_URL")
+        SUPABASE_KEY = os.environ.get("SUPABASE_KEY")
+        
+        if not SUPABASE_URL or not SUPABASE_KEY:
+            return None
+        
+        _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    
+    return _supabase_client
 
-# Hardcoded valid keys for testing
-VALID_KEYS = {
-    '21EZ5E9N8BXR1UEY': {
-        'active': True,
-        'maxDevices': 3,
-        'createdAt': '2026-01-24'
-    },
-    # Add more test keys here
-}
 
 class handler(BaseHTTPRequestHandler):
+    def _send_body(self, body, status_code=200):
+        """Send a pre-encoded JSON body"""
+        self.send_response(status_code)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
     def do_POST(self):
         try:
             # Read request body
-            content_length = int(self.headers['Content-Length'])
+            content_length = int(self.headers.get('Content-Length', 0))
             post_data = self.rfile.read(content_length)
             data = json.loads(post_data.decode('utf-8'))
             
-            key = data.get('key')
+            key = data.get('key', '').strip()
             
             if not key:
-                self.send_response(400)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                response = {'error': 'License key is required'}
-                self.wfile.write(json.dumps(response).encode())
-                return
+                return self._send_body(MISSING_KEY_BODY, 400)
             
-            print(f"[Validate] Checking key: {key}")
+            # Reject malformed keys before touching the database
+            key_no_dashes = key.replace('-', '')
+            if len(key_no_dashes) != 16 or not key_no_dashes.isalnum():
+                print(f"[Validate] Invalid key format: {key}")
+                return self._send_body(INVALID_FORMAT_BODY, 400)
             
-            # Check if key exists
-            license_data = VALID_KEYS.get(key)
+            supabase = get_supabase_client()
+            if supabase is None:
+                print("[Validate] ERROR: Supabase credentials not set")
+                return self._send_body(CONFIG_ERROR_BODY, 500)
             
-            if not license_data:
+            # Hedged read; serves the last known status if Supabase is down
+            try:
+                rows = cached_read(
+                    key,
+                    lambda: supabase.table('licenses').select(STATUS_COLUMNS).eq('license_key', key).execute().data
+                )
+                
+                # Row not reached by licenses_backfill_status yet: derive the
+                # projection from the base columns instead
+                if rows and rows[0]['seats_used'] is None:
+                    base = cached_read(
+                        (key, 'base'),
+                        lambda: supabase.table('licenses').select(BASE_COLUMNS).eq('license_key', key).execute().data
+                    )
+                    rows = [{**rows[0], **project_license(base[0])}] if base else []
+            except (CircuitOpenError, DeadlineExceeded) as e:
+                print(f"[Validate] Store unavailable: {e}")
+                return self._send_body(UNAVAILABLE_BODY, 503)
+            
+            if not rows:
                 print(f"[Validate] Key not found: {key}")
-                self.send_response(404)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                response = {
-                    'error': 'License key not found',
-                    'detail': 'Not Found'
-                }
-                self.wfile.write(json.dumps(response).encode())
-                return
+                return self._send_body(NOT_FOUND_BODY, 404)
             
-            # Check if license is active
-            if not license_data.get('active'):
-                print(f"[Validate] Key inactive: {key}")
-                self.send_response(403)
-                self.send_header('Content-type', 'application/json')
-                self.end_headers()
-                response = {'error': 'License key is inactive'}
-                self.wfile.write(json.dumps(response).encode())
-                return
+            row = rows[0]
+            expires_at = row['expires_at']
+            expires_json = 'null' if expires_at is None else expires_at
             
-            print(f"[Validate] Key valid: {key}")
+            # The sweep flags expiry in batches; the epoch compare covers the gap
+            if row['status'] == 'expired' or (expires_at is not None and expires_at <= time.time()):
+                print(f"[Validate] Key expired: {key}")
+                body = EXPIRED_TEMPLATE.format(key=json.dumps(key), expires_at=expires_json)
+                return self._send_body(body.encode(), 403)
             
-            # Return success
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
-                'valid': True,
-                'key': key,
-                'maxDevices': license_data.get('maxDevices'),
-                'createdAt': license_data.get('createdAt')
-            }
-            self.wfile.write(json.dumps(response).encode())
+            body = VALID_TEMPLATE.format(
+                key=json.dumps(key),
+                status=row['status'],
+                seats_used=row['seats_used'],
+                seats_max=row['seats_max'],
+                expires_at=expires_json,
+                created_at=json.dumps(row['created_at'])
+            )
+            return self._send_body(body.encode(), 200)
             
+        except json.JSONDecodeError as e:
+            print(f"[Validate] JSON decode error: {e}")
+            return self._send_body(b'{"error": "Invalid JSON in request body"}', 400)
+        
         except Exception as e:
             print(f"[Validate] Error: {e}")
-            self.send_response(500)
-            self.send_header('Content-type', 'application/json')
-            self.end_headers()
-            response = {
+            return self._send_body(json.dumps({
                 'error': 'Internal server error',
                 'detail': str(e)
-            }
-            self.wfile.write(json.dumps(response).encode())
+            }).encode(), 500)
     
     def do_GET(self):
-        self.send_response(405)
-        self.send_header('Content-type', 'application/json')
-        self.end_headers()
-        response = {'error': 'Method not allowed'}
-        self.wfile.write(json.dumps(response).encode())
+        return self._send_body(METHOD_NOT_ALLOWED_BODY, 405)
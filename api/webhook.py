@@ -1 +1,4 @@
+# Vercel entry point. Without WEBHOOK_QUEUE_PATH the webhook processes each
+# order inline; the queue + worker pool needs a persistent host (see
+# app/routes/webhook.py).
 from app.main import app
@@ -18,6 +18,9 @@ FROM_SENDER_EMAIL = require_env("FROM_SENDER_EMAIL")
 # Optional fallback email
 TO_EMAIL = os.getenv("TO_EMAIL")
 
+# Admin API (endpoints are disabled when unset)
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
 # Supabase
 SUPABASE_URL = require_env("SUPABASE_URL")
 SUPABASE_KEY = require_env("SUPABASE_KEY")
@@ -1,5 +1,7 @@
 from fastapi import FastAPI
+from app.routes.admin import router as admin_router
 from app.routes.webhook import router
 
 app = FastAPI()
 app.include_router(router)
+app.include_router(admin_router)
@@ -0,0 +1,110 @@
+import csv
+import hmac
+import io
+import json
+from typing import Iterator
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.config import ADMIN_API_TOKEN
+from app.services.license import (
+    ADMIN_COLUMNS,
+    MIN_SEARCH_LENGTH,
+    iter_licenses,
+    search_licenses,
+)
+from app.services.webhook_queue import get_webhook_queue, queue_enabled
+
+EXPORT_FIELDS = [column.strip() for column in ADMIN_COLUMNS.split(",")]
+# Leading characters a spreadsheet would evaluate as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def require_admin(authorization: str | None = Header(default=None)):
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin API is not configured")
+    # Compare bytes: str compare_digest raises on non-ASCII input
+    if not authorization or not hmac.compare_digest(
+        authorization.encode("utf-8"), f"Bearer {ADMIN_API_TOKEN}".encode("utf-8")
+    ):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+router = APIRouter(prefix="/api/admin", dependencies=[Depends(require_admin)])
+
+
+@router.get("/licenses")
+def admin_search_licenses(
+    email: str | None = Query(default=None, min_length=MIN_SEARCH_LENGTH),
+    order_id: str | None = None,
+    key: str | None = Query(default=None, min_length=MIN_SEARCH_LENGTH),
+    after: int | None = None,
+    limit: int = Query(default=50, ge=1, le=200),
+):
+    if not (email or order_id or key):
+        raise HTTPException(status_code=400, detail="Provide email, order_id or key")
+
+    items = search_licenses(
+        email=email,
+        order_id=order_id,
+        key=key,
+        after_id=after,
+        limit=limit,
+    )
+
+    return {
+        "items": items,
+        "next_cursor": items[-1]["id"] if len(items) == limit else None,
+    }
+
+
+def _csv_safe(row: dict) -> dict:
+    """Neutralise customer-supplied values a spreadsheet would run as formulas."""
+    return {
+        field: f"'{value}" if isinstance(value, str) and value.startswith(FORMULA_PREFIXES) else value
+        for field, value in row.items()
+    }
+
+
+def _csv_rows() -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+
+    for page in iter_licenses():
+        writer.writerows(_csv_safe(row) for row in page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _jsonl_rows() -> Iterator[str]:
+    for page in iter_licenses():
+        yield "".join(json.dumps(row, separators=(",", ":")) + "\n" for row in page)
+
+
+@router.get("/licenses/export")
+def admin_export_licenses(format: str = Query(default="csv", pattern="^(csv|jsonl)$")):
+    if format == "jsonl":
+        return StreamingResponse(
+            _jsonl_rows(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": "attachment; filename=licenses.jsonl"},
+        )
+
+    return StreamingResponse(
+        _csv_rows(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=licenses.csv"},
+    )
+
+
+@router.get("/queue")
+def admin_queue_status():
+    """Webhook queue depth and processing lag"""
+    if not queue_enabled():
+        return {"enabled": False}
+
+    return {"enabled": True, **get_webhook_queue().stats()}
@@ -0,0 +1,54 @@
+from app.services.devices import merge_devices
+from app.services.license import iter_licenses
+from app.services.supabase import get_supabase_client
+
+
+def _array_literal(values: list[str]) -> str:
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'"{value}"' for value in escaped) + "}"
+
+
+def migrate_device_hashes() -> dict:
+    """Move raw ids from activated_devices into device_fingerprints.
+
+    Returns how many rows were migrated and how many were skipped because a
+    concurrent activation changed them first. Safe to re-run: rows with an
+    empty activated_devices are already migrated and left untouched.
+    Run with `python -m app.services.device_migration` (needs DEVICE_HASH_SECRET).
+    """
+    client = get_supabase_client()
+    migrated = 0
+    skipped = 0
+
+    for page in iter_licenses(columns="id, activated_devices, device_fingerprints"):
+        for row in page:
+            devices = row.get("activated_devices") or []
+            if not devices:
+                continue
+
+            updated = (
+                client.table("licenses")
+                .update({
+                    "device_fingerprints": merge_devices(row.get("device_fingerprints"), devices),
+                    "activated_devices": [],
+                })
+                .eq("id", row["id"])
+                # Skip rows an activation rewrote since we read them
+                .eq("activated_devices", _array_literal(devices))
+                .execute()
+                .data
+            )
+            if updated:
+                migrated += 1
+            else:
+                skipped += 1
+
+    return {"migrated": migrated, "skipped": skipped}
+
+
+if __name__ == "__main__":
+    result = migrate_device_hashes()
+    print(
+        f"✅ Migrated device fingerprints on {result['migrated']} licenses "
+        f"({result['skipped']} changed concurrently; re-run to pick them up)"
+    )
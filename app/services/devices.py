@@ -0,0 +1,61 @@
+import hashlib
+import os
+from bisect import bisect_left, insort
+
+DEVICE_HASH_BYTES = 16
+# Fingerprints live in licenses.device_fingerprints (bytea[]), 16 bytes each.
+# PostgREST exchanges bytea in Postgres' hex input/output format, "\x<hex>",
+# so that is the in-memory form; it is the value's encoding, not a marker.
+BYTEA_HEX_PREFIX = "\\x"
+
+
+def _device_secret() -> bytes:
+    secret = os.environ.get("DEVICE_HASH_SECRET", "").encode("utf-8")
+    if not secret:
+        raise RuntimeError("Missing environment variable: DEVICE_HASH_SECRET")
+    # BLAKE2b keys are limited to 64 bytes
+    return secret if len(secret) <= 64 else hashlib.blake2b(secret).digest()
+
+
+def normalize_device_id(device_id: str) -> str:
+    return device_id.strip().casefold()
+
+
+def hash_device_id(device_id: str) -> str:
+    """Keyed 16-byte BLAKE2b fingerprint of a client device id, bytea-encoded."""
+    return BYTEA_HEX_PREFIX + hashlib.blake2b(
+        normalize_device_id(device_id).encode("utf-8"),
+        digest_size=DEVICE_HASH_BYTES,
+        key=_device_secret(),
+    ).hexdigest()
+
+
+def device_log_id(device_hash: str) -> str:
+    """Short, non-reversible tag for log lines."""
+    return device_hash[len(BYTEA_HEX_PREFIX):][:8]
+
+
+def merge_devices(
+    fingerprints: list[str] | None,
+    legacy_devices: list[str] | None = None,
+) -> list[str]:
+    """Return a sorted, de-duplicated fingerprint list for a license row.
+
+    legacy_devices are raw ids from activated_devices (text[]), written before
+    fingerprinting; they are hashed here, so any read-modify-write of a row
+    that also clears activated_devices migrates it.
+    """
+    return sorted(
+        {fingerprint.lower() for fingerprint in fingerprints or []}
+        | {hash_device_id(device) for device in legacy_devices or []}
+    )
+
+
+def has_device(devices: list[str], device_hash: str) -> bool:
+    """Membership test on a list kept sorted by merge_devices/add_device."""
+    index = bisect_left(devices, device_hash)
+    return index < len(devices) and devices[index] == device_hash
+
+
+def add_device(devices: list[str], device_hash: str) -> None:
+    insort(devices, device_hash)
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from app.config import FROM_SENDER_EMAIL
+from app.services.license import (
+    SWEEP_MAX_PAGES,
+    claim_reminders,
+    iter_expiring_licenses,
+    mark_expired_licenses,
+    release_reminders,
+)
+from app.services.sendgrid import send_bulk_email
+
+REMINDER_WINDOW_DAYS = 7
+
+REMINDER_HTML = """
+<div style="font-family:Arial,sans-serif; max-width:600px; margin:auto; padding:20px;">
+    <h2 style="color:#333;">Hi -customer_name-, your HandMidi license expires soon</h2>
+
+    <p style="font-size:16px; color:#666;">
+        License <strong style="font-family:monospace;">-license_key-</strong>
+        expires on <strong>-expiry_date-</strong>.
+    </p>
+
+    <p style="font-size:16px; color:#666;">
+        Renew before then to keep using HandMidi without interruption.
+    </p>
+</div>
+"""
+
+
+def send_expiry_reminders(
+    window_days: int = REMINDER_WINDOW_DAYS,
+    max_pages: int = SWEEP_MAX_PAGES,
+) -> int:
+    now = datetime.utcnow()
+    sent = 0
+
+    pages = iter_expiring_licenses(
+        before=now + timedelta(days=window_days),
+        after=now,
+        unreminded_only=True,
+    )
+    for page_number, page in enumerate(pages):
+        if page_number >= max_pages:
+            break
+
+        claimed = claim_reminders([row["id"] for row in page])
+        if not claimed:
+            continue
+
+        try:
+            send_bulk_email(
+                    [
+                    (
+                        row["customer_email"],
+                        {
+                            "-customer_name-": row.get("customer_name") or "Customer",
+                            "-license_key-": row["license_key"],
+                            "-expiry_date-": row["expiry_date"][:10],
+                        },
+                    )
+                    for row in claimed
+                ],
+                from_email=FROM_SENDER_EMAIL,
+                subject="Your HandMidi license is about to expire",
+                html=REMINDER_HTML,
+            )
+        except Exception:
+            release_reminders([row["id"] for row in claimed])
+            raise
+        sent += len(claimed)
+
+    return sent
+
+
+def run_expiry_sweep() -> dict:
+    # Expire first so a SendGrid outage can't stop validate from rejecting
+    result = {"expired": mark_expired_licenses()}
+
+    try:
+        result["reminders_sent"] = send_expiry_reminders()
+    except Exception as e:
+        print(f"❌ Expiry reminders failed: {e}")
+        result["reminders_sent"] = 0
+        result["reminder_error"] = str(e)
+
+    return result
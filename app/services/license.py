@@ -1,8 +1,24 @@
 import secrets
 import string
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+from typing import Iterator
 from app.services.supabase import get_supabase_client
 
+LICENSE_TERM_DAYS = 365
+SWEEP_PAGE_SIZE = 500
+# Pages per sweep run, so one cron invocation stays well inside the function
+# time limit; whatever is left is picked up by the next (hourly) run.
+SWEEP_MAX_PAGES = 20
+RENEWAL_ATTEMPTS = 3
+EXPORT_PAGE_SIZE = 1000
+# pg_trgm can only use its index for patterns with at least 3 characters.
+MIN_SEARCH_LENGTH = 3
+
+ADMIN_COLUMNS = (
+    "id, license_key, customer_email, customer_name, order_id, product_name, "
+    "status, seats_used, seats_max, expiry_date, activated_at, created_at"
+)
+
 
 def generate_license_key() -> str:
     characters = string.ascii_uppercase + string.digits
@@ -19,7 +35,7 @@ def create_license(
     product_name: str = "Software License",
 ) -> dict:
     license_key = generate_license_key()
-    expiry_date = datetime.utcnow() + timedelta(days=365)
+    expiry_date = datetime.utcnow() + timedelta(days=LICENSE_TERM_DAYS)
 
     response = (
         get_supabase_client()
@@ -49,6 +65,16 @@ def create_license(
     }
 
 
+def mark_license_email_sent(order_id: str) -> None:
+    (
+        get_supabase_client()
+        .table("licenses")
+        .update({"email_sent_at": datetime.utcnow().isoformat()})
+        .eq("order_id", order_id)
+        .execute()
+    )
+
+
 def get_license_by_order(order_id: str) -> dict | None:
     response = (
         get_supabase_client()
@@ -59,3 +85,259 @@ def get_license_by_order(order_id: str) -> dict | None:
     )
 
     return response.data[0] if response.data else None
+
+
+def _escape_like(value: str) -> str:
+    # PostgREST rewrites every "*" to "%" and offers no escape for it, so a
+    # literal "*" is matched with the single-character wildcard instead.
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return escaped.replace("*", "_")
+
+
+def search_licenses(
+    email: str | None = None,
+    order_id: str | None = None,
+    key: str | None = None,
+    after_id: int | None = None,
+    limit: int = 50,
+) -> list[dict]:
+    """Find licenses by exact order id or partial email / license key.
+
+    Partial matches are served by the trigram indexes on customer_email and
+    license_key; results are ordered by id so after_id works as a keyset cursor.
+    """
+    query = get_supabase_client().table("licenses").select(ADMIN_COLUMNS)
+
+    if order_id:
+        query = query.eq("order_id", order_id)
+    if email:
+        query = query.ilike("customer_email", f"%{_escape_like(email.strip())}%")
+    if key:
+        query = query.ilike("license_key", f"%{_escape_like(key.strip().upper())}%")
+    if after_id is not None:
+        query = query.gt("id", after_id)
+
+    return query.order("id").limit(limit).execute().data
+
+
+def iter_licenses(
+    columns: str = ADMIN_COLUMNS,
+    page_size: int = EXPORT_PAGE_SIZE,
+) -> Iterator[list[dict]]:
+    """Yield every license in id order, one keyset page at a time."""
+    last_id = None
+
+    while True:
+        query = get_supabase_client().table("licenses").select(columns)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+
+        rows = query.order("id").limit(page_size).execute().data
+        if not rows:
+            return
+
+        yield rows
+
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def link_subscription(order_id: str, subscription_contract_id: str) -> dict | None:
+    response = (
+        get_supabase_client()
+        .table("licenses")
+        .update({"subscription_contract_id": subscription_contract_id})
+        .eq("order_id", order_id)
+        .execute()
+    )
+
+    return response.data[0] if response.data else None
+
+
+def renew_license(
+    subscription_contract_id: str,
+    renewal_order_id: str,
+    term_days: int = LICENSE_TERM_DAYS,
+) -> dict | None:
+    """Extend a subscription license by one term, in place.
+
+    Renewals are applied relative to the later of now and the current expiry,
+    so early renewals don't lose time and lapsed ones restart from today.
+    Shopify retries webhooks, so the renewal order id is recorded and a
+    repeated delivery is a no-op. The update is guarded on the expiry we read
+    to avoid two concurrent renewals both extending from the same base.
+    """
+    client = get_supabase_client()
+
+    for _ in range(RENEWAL_ATTEMPTS):
+        response = (
+            client.table("licenses")
+            .select("id, license_key, expiry_date, last_renewal_order_id")
+            .eq("subscription_contract_id", subscription_contract_id)
+            .execute()
+        )
+        if not response.data:
+            return None
+
+        record = response.data[0]
+        if record.get("last_renewal_order_id") == renewal_order_id:
+            return record
+
+        now = datetime.utcnow()
+        base = max(_parse_timestamp(record["expiry_date"]), now)
+        expiry_date = base + timedelta(days=term_days)
+
+        updated = (
+            client.table("licenses")
+            .update(
+                {
+                    "expiry_date": expiry_date.isoformat(),
+                    "last_renewal_order_id": renewal_order_id,
+                    "reminder_sent_at": None,
+                }
+            )
+            .eq("id", record["id"])
+            .eq("expiry_date", record["expiry_date"])
+            .execute()
+        )
+        if updated.data:
+            return updated.data[0]
+
+    raise RuntimeError(
+        f"Renewal of subscription {subscription_contract_id} did not apply "
+        f"after {RENEWAL_ATTEMPTS} attempts"
+    )
+
+
+def iter_expiring_licenses(
+    before: datetime,
+    after: datetime | None = None,
+    columns: str = "id, license_key, customer_email, customer_name, expiry_date",
+    page_size: int = SWEEP_PAGE_SIZE,
+    unreminded_only: bool = False,
+) -> Iterator[list[dict]]:
+    """Yield pages of non-expired licenses with after <= expiry_date < before.
+
+    Pages are fetched with a keyset on (expiry_date, id) so each page is a
+    range scan on licenses_expiry_sweep_idx (licenses_reminder_sweep_idx with
+    unreminded_only), however deep the sweep goes.
+    """
+    cursor = None
+
+    while True:
+        query = (
+            get_supabase_client()
+            .table("licenses")
+            .select(columns)
+            .neq("status", "expired")
+            .lt("expiry_date", before.isoformat())
+        )
+        if unreminded_only:
+            query = query.is_("reminder_sent_at", "null")
+        if cursor is not None:
+            last_expiry, last_id = cursor
+            query = query.or_(
+                f'expiry_date.gt."{last_expiry}",'
+                f'and(expiry_date.eq."{last_expiry}",id.gt.{last_id})'
+            )
+        elif after is not None:
+            query = query.gte("expiry_date", after.isoformat())
+
+        rows = query.order("expiry_date").order("id").limit(page_size).execute().data
+        if not rows:
+            return
+
+        yield rows
+
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1]["expiry_date"], rows[-1]["id"])
+
+
+def claim_reminders(license_ids: list[int]) -> list[dict]:
+    """Stamp reminder_sent_at before sending; return the rows this call claimed.
+
+    Claiming first means a run killed mid-send never re-sends, and rows a
+    concurrent run already claimed are not returned.
+    """
+    if not license_ids:
+        return []
+
+    return (
+        get_supabase_client()
+        .table("licenses")
+        .update({"reminder_sent_at": datetime.utcnow().isoformat()})
+        .in_("id", license_ids)
+        .is_("reminder_sent_at", "null")
+        .execute()
+        .data
+    )
+
+
+def release_reminders(license_ids: list[int]) -> None:
+    """Undo claim_reminders after a failed send so the next run retries."""
+    if not license_ids:
+        return
+
+    (
+        get_supabase_client()
+        .table("licenses")
+        .update({"reminder_sent_at": None})
+        .in_("id", license_ids)
+        .execute()
+    )
+
+
+def mark_expired_licenses(
+    page_size: int = SWEEP_PAGE_SIZE,
+    max_pages: int = SWEEP_MAX_PAGES,
+) -> int:
+    """Flag every license past its expiry_date as expired; return the count.
+
+    Each flagged row drops out of the sweep index predicate, so the next
+    page is always the head of the index and no cursor is needed.
+    The status trigger also derives 'expired' on any write past expiry;
+    this catches rows that simply aged out without being touched.
+    """
+    client = get_supabase_client()
+    now = datetime.utcnow().isoformat()
+    expired = 0
+
+    for _ in range(max_pages):
+        rows = (
+            client.table("licenses")
+            .select("id")
+            .neq("status", "expired")
+            .lt("expiry_date", now)
+            .order("expiry_date")
+            .limit(page_size)
+            .execute()
+            .data
+        )
+        if not rows:
+            return expired
+
+        updated = (
+            client.table("licenses")
+            .update({"status": "expired"})
+            .in_("id", [row["id"] for row in rows])
+            .execute()
+            .data
+        )
+        if not updated:
+            # Nothing stuck (e.g. RLS); re-reading the same page would spin forever
+            raise RuntimeError("Failed to mark expired licenses")
+        expired += len(updated)
+
+        if len(rows) < page_size:
+            return expired
+
+    return expired
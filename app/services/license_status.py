@@ -0,0 +1,43 @@
+import time
+from datetime import datetime, timezone
+
+# Base columns the projection is derived from
+BASE_COLUMNS = "is_activated, device_limit, device_fingerprints, activated_devices, expiry_date"
+
+
+def expiry_epoch(expiry_date: str | None) -> int | None:
+    if not expiry_date:
+        return None
+
+    parsed = datetime.fromisoformat(expiry_date)
+    if parsed.tzinfo is None:
+        # Naive timestamps are written from datetime.utcnow()
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def project_license(row: dict) -> dict:
+    """Python twin of the licenses_refresh_status trigger.
+
+    Used for rows the backfill hasn't reached yet (seats_used is NULL).
+    """
+    # Legacy raw ids not yet moved to device_fingerprints still hold a seat
+    seats_used = len(row.get("device_fingerprints") or []) + len(row.get("activated_devices") or [])
+    seats_max = row.get("device_limit") or 1
+    expires_at = expiry_epoch(row.get("expiry_date"))
+
+    if expires_at is not None and expires_at <= time.time():
+        status = "expired"
+    elif seats_used >= seats_max:
+        status = "full"
+    elif row.get("is_activated"):
+        status = "active"
+    else:
+        status = "inactive"
+
+    return {
+        "status": status,
+        "seats_used": seats_used,
+        "seats_max": seats_max,
+        "expires_at": expires_at,
+    }
@@ -0,0 +1,142 @@
+from app.config import FROM_SENDER_EMAIL
+from app.services.license import (
+    create_license,
+    get_license_by_order,
+    link_subscription,
+    mark_license_email_sent,
+    renew_license,
+)
+from app.services.sendgrid import send_email
+
+SUBSCRIPTION_CREATED = "subscription_contracts/create"
+SUBSCRIPTION_RENEWED = "subscription_billing_attempts/success"
+
+
+class LicenseNotFound(Exception):
+    """A subscription event arrived before the license it refers to exists."""
+
+
+LICENSE_EMAIL_HTML = """
+<div style="font-family:Arial,sans-serif; max-width:600px; margin:auto; padding:20px;">
+    <h2 style="color:#333;">Thank you for your purchase, {customer_name}!</h2>
+
+    <p style="font-size:16px; color:#666;">Your HandMidi license key is ready:</p>
+
+    <div style="background:#667eea; color:white; padding:20px;
+                font-family:monospace; font-size:24px; text-align:center;
+                border-radius:8px; margin:20px 0; letter-spacing:2px;">
+        {license_key}
+    </div>
+
+    <div style="background:#f5f5f5; padding:15px; border-radius:8px; margin:20px 0;">
+        <p style="margin:5px 0;"><strong>Order ID:</strong> {order_id}</p>
+        <p style="margin:5px 0;"><strong>Expires:</strong> {expiry_date}</p>
+        <p style="margin:5px 0;"><strong>Device Limit:</strong> 1 device</p>
+    </div>
+
+    <h3 style="color:#333; margin-top:30px;">How to Activate:</h3>
+    <ol style="color:#666; line-height:1.8;">
+        <li>Download and install HandMidi</li>
+        <li>Launch the application</li>
+        <li>Enter your license key when prompted</li>
+        <li>Start creating music!</li>
+    </ol>
+
+    <hr style="border:none; border-top:1px solid #ddd; margin:30px 0;">
+
+    <p style="font-size:14px; color:#999;">
+        Need help? Contact us at <strong>{support_email}</strong>
+    </p>
+</div>
+"""
+
+
+def ordering_key(topic: str, data: dict) -> str:
+    """Key that serializes processing of related webhooks.
+
+    A subscription contract is keyed by the order that created it, so it is
+    only linked once that order's license exists.
+    """
+    if topic == SUBSCRIPTION_CREATED:
+        return f"order:{data.get('origin_order_id')}"
+    if topic == SUBSCRIPTION_RENEWED:
+        return f"subscription:{data.get('subscription_contract_id')}"
+    return f"order:{data.get('id')}"
+
+
+def process_order(data: dict) -> None:
+    order_id = str(data.get("id"))
+
+    # Renewal orders are handled by subscription_billing_attempts/success,
+    # which extends the existing license instead of issuing a new key
+    if data.get("source_name") == "subscription_contract":
+        print(f"🔁 Skipping subscription renewal order {order_id}")
+        return
+
+    customer_email = data.get("email") or (data.get("customer") or {}).get("email")
+
+    if not customer_email:
+        print("⚠️ No customer email found")
+        return
+
+    customer_name = (data.get("customer") or {}).get("first_name", "Customer")
+
+    line_items = data.get("line_items", [])
+    product_name = line_items[0].get("name", "HandMidi License") if line_items else "HandMidi License"
+
+    print(f"📧 Processing order {order_id} for {customer_email}")
+
+    # A retry may find the license already created (e.g. the insert landed
+    # but the client timed out); only email_sent_at means we're done
+    license_data = get_license_by_order(order_id)
+    if license_data and license_data.get("email_sent_at"):
+        print(f"⚠️ License already delivered for order {order_id}")
+        return
+
+    if not license_data:
+        license_data = create_license(
+            customer_email=customer_email,
+            customer_name=customer_name,
+            order_id=order_id,
+            product_name=product_name,
+        )
+        print(f"✅ License created: {license_data['license_key']}")
+
+    # Failures propagate so the queue retries the delivery
+    send_email(
+        to_email=customer_email,
+        from_email=FROM_SENDER_EMAIL,
+        subject="Your HandMidi License Key",
+        html=LICENSE_EMAIL_HTML.format(
+            customer_name=customer_name,
+            license_key=license_data["license_key"],
+            order_id=order_id,
+            expiry_date=license_data["expiry_date"][:10],
+            support_email=FROM_SENDER_EMAIL,
+        ),
+    )
+    mark_license_email_sent(order_id)
+    print(f"✅ Email sent to: {customer_email}")
+
+
+def process_subscription_event(topic: str, data: dict) -> None:
+    if topic == SUBSCRIPTION_CREATED:
+        contract_id = str(data.get("id"))
+        order_id = str(data.get("origin_order_id"))
+        print(f"🔗 Linking subscription {contract_id} to order {order_id}")
+        license_record = link_subscription(order_id, contract_id)
+    else:
+        contract_id = str(data.get("subscription_contract_id"))
+        renewal_order_id = str(data.get("order_id"))
+        print(f"🔁 Renewing subscription {contract_id} (order {renewal_order_id})")
+        license_record = renew_license(contract_id, renewal_order_id)
+
+    if not license_record:
+        raise LicenseNotFound(f"No license found for subscription {contract_id}")
+
+
+def process_event(topic: str, data: dict) -> None:
+    if topic in (SUBSCRIPTION_CREATED, SUBSCRIPTION_RENEWED):
+        process_subscription_event(topic, data)
+    else:
+        process_order(data)
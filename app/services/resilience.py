@@ -0,0 +1,281 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Hashable
+
+try:
+    from httpx import TransportError
+except ImportError:  # pragma: no cover - httpx ships with supabase
+    TransportError = ConnectionError
+
+STORE_DEADLINE_SECONDS = float(os.getenv("STORE_DEADLINE_SECONDS", "3"))
+HEDGE_AFTER_SECONDS = float(os.getenv("STORE_HEDGE_AFTER_SECONDS", "0.25"))
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_SECONDS = 30
+READ_CACHE_SIZE = 10_000
+READ_CACHE_TTL_SECONDS = 300
+# SQLSTATE classes meaning the database itself is unavailable or overloaded:
+# connection exception, insufficient resources, operator intervention
+# (includes statement timeouts), system error.
+UNAVAILABLE_SQLSTATE_CLASSES = ("08", "53", "57", "58")
+
+# Calls that blow their deadline keep running here until the client gives up.
+_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="store-call")
+
+_metrics_lock = threading.Lock()
+_metrics: dict[str, int] = {}
+_breakers: dict[str, "CircuitBreaker"] = {}
+
+
+def incr(name: str, amount: int = 1) -> None:
+    with _metrics_lock:
+        _metrics[name] = _metrics.get(name, 0) + amount
+
+
+def log_metrics(event: str) -> None:
+    """Emit counters and breaker state as one structured log line.
+
+    Activate, validate and the worker pool are separate processes, so the
+    counters are per-process; the log drain is where they come together.
+    """
+    print("[Metrics] " + json.dumps({"event": event, "pid": os.getpid(), **metrics_snapshot()}))
+
+
+def is_store_fault(error: BaseException) -> bool:
+    """True for deadline, transport and server-side failures of the store.
+
+    PostgREST 4xx errors (bad filters, constraint violations, RLS denials)
+    are the caller's fault and must not trip the breaker.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, TransportError)):
+        return True
+
+    code = getattr(error, "code", None)
+    if not isinstance(code, str):
+        return False
+    if code.isdigit():
+        # postgrest-py reports non-JSON error bodies with the HTTP status as code
+        return code.startswith("5")
+    if code.startswith("PGRST0"):
+        # PGRST0xx: PostgREST could not reach the database (HTTP 503)
+        return True
+    return len(code) == 5 and code[:2] in UNAVAILABLE_SQLSTATE_CLASSES
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures, then let a single probe call through.
+
+    closed -> open after failure_threshold consecutive failures;
+    open -> half_open once reset_timeout has passed;
+    half_open -> closed on the probe's success, back to open on its failure.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+        _breakers[name] = self
+
+    def allow(self) -> bool:
+        half_opened = False
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._probing = False
+                half_opened = True
+
+            allowed = self.state == "closed" or (
+                self.state == "half_open" and not self._probing
+            )
+            if self.state == "half_open" and allowed:
+                self._probing = True
+
+        if half_opened:
+            log_metrics(f"{self.name}.half_open")
+        if not allowed:
+            incr(f"{self.name}.rejected")
+        return allowed
+
+    def is_open(self) -> bool:
+        """True while calls would be rejected; unlike allow() this claims no probe."""
+        with self._lock:
+            return (
+                self.state == "open"
+                and time.monotonic() - self.opened_at < self.reset_timeout
+            )
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot without counting a success or failure."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            recovered = self.state != "closed"
+            self.state = "closed"
+            self.failures = 0
+            self._probing = False
+
+        if recovered:
+            log_metrics(f"{self.name}.closed")
+
+    def record_failure(self) -> None:
+        opened = False
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                opened = self.state != "open"
+                self.state = "open"
+                self.opened_at = time.monotonic()
+                self._probing = False
+
+        if opened:
+            incr(f"{self.name}.opened")
+            log_metrics(f"{self.name}.opened")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.failures}
+
+
+class ReadCache:
+    """Bounded LRU of recent successful reads, served while the breaker is open."""
+
+    def __init__(self, max_size: int = READ_CACHE_SIZE, ttl: float = READ_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return False, None
+            self._entries.move_to_end(key)
+            return True, entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+store_breaker = CircuitBreaker("supabase")
+read_cache = ReadCache()
+
+
+def _await_first(futures: list, deadline_at: float):
+    done, _ = wait(futures, timeout=max(0.0, deadline_at - time.monotonic()),
+                   return_when=FIRST_COMPLETED)
+    return done
+
+
+def store_call(
+    fn: Callable[[], Any],
+    deadline: float = STORE_DEADLINE_SECONDS,
+    breaker: CircuitBreaker = store_breaker,
+    hedge_after: float | None = None,
+) -> Any:
+    """Run a store call under a deadline, guarded by the circuit breaker.
+
+    With hedge_after set (idempotent reads only), a second identical call is
+    started if the first hasn't answered by then and the first result wins.
+    Only store faults (see is_store_fault) count against the breaker; any
+    other error is re-raised as-is.
+    """
+    if not breaker.allow():
+        raise CircuitOpenError(f"{breaker.name} circuit is open")
+
+    incr(f"{breaker.name}.calls")
+    deadline_at = time.monotonic() + deadline
+    futures = [_executor.submit(fn)]
+
+    if hedge_after is not None and hedge_after < deadline:
+        if not _await_first(futures, time.monotonic() + hedge_after):
+            incr(f"{breaker.name}.hedged")
+            futures.append(_executor.submit(fn))
+
+    pending = list(futures)
+    error: BaseException | None = None
+    while pending:
+        done = _await_first(pending, deadline_at)
+        if not done:
+            break
+        for future in done:
+            pending.remove(future)
+            exception = future.exception()
+            if exception is None:
+                breaker.record_success()
+                return future.result()
+            if not is_store_fault(exception):
+                breaker.release_probe()
+                raise exception
+            error = exception
+
+    if error is not None and not pending:
+        incr(f"{breaker.name}.errors")
+        breaker.record_failure()
+        raise error
+
+    incr(f"{breaker.name}.timeouts")
+    breaker.record_failure()
+    log_metrics(f"{breaker.name}.timeout")
+    raise DeadlineExceeded(f"{breaker.name} call exceeded {deadline}s deadline")
+
+
+def cached_read(
+    cache_key: Hashable,
+    fn: Callable[[], Any],
+    deadline: float = STORE_DEADLINE_SECONDS,
+    hedge_after: float | None = HEDGE_AFTER_SECONDS,
+    breaker: CircuitBreaker = store_breaker,
+    cache: ReadCache = read_cache,
+) -> Any:
+    """Hedged store read that falls back to the last good value if the store is down."""
+    try:
+        value = store_call(fn, deadline=deadline, breaker=breaker, hedge_after=hedge_after)
+    except Exception as e:
+        if not (isinstance(e, CircuitOpenError) or is_store_fault(e)):
+            raise
+        found, value = cache.get(cache_key)
+        if not found:
+            raise
+        incr("read_cache.stale_hits")
+        return value
+
+    cache.put(cache_key, value)
+    return value
+
+
+def metrics_snapshot() -> dict:
+    with _metrics_lock:
+        counters = dict(_metrics)
+
+    return {
+        "breakers": {name: breaker.snapshot() for name, breaker in list(_breakers.items())},
+        "counters": counters,
+    }
@@ -1,7 +1,10 @@
 from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from sendgrid.helpers.mail import Mail, To
 from app.config import SENDGRID_API_KEY
 
+# SendGrid accepts at most 1000 personalizations per send request.
+MAX_PERSONALIZATIONS = 1000
+
 
 def send_email(to_email: str, from_email: str, subject: str, html: str):
     message = Mail(
@@ -13,3 +16,31 @@ def send_email(to_email: str, from_email: str, subject: str, html: str):
 
     sg = SendGridAPIClient(SENDGRID_API_KEY)
     sg.send(message)
+
+
+def send_bulk_email(
+    recipients: list[tuple[str, dict[str, str]]],
+    from_email: str,
+    subject: str,
+    html: str,
+):
+    """Send one templated email to many recipients in as few requests as possible.
+
+    Each recipient is an (email, substitutions) pair; substitution keys such as
+    "-license_key-" are replaced per recipient by SendGrid.
+    """
+    sg = SendGridAPIClient(SENDGRID_API_KEY)
+
+    for start in range(0, len(recipients), MAX_PERSONALIZATIONS):
+        batch = recipients[start:start + MAX_PERSONALIZATIONS]
+        message = Mail(
+            from_email=from_email,
+            to_emails=[
+                To(email=email, substitutions=substitutions)
+                for email, substitutions in batch
+            ],
+            subject=subject,
+            html_content=html,
+            is_multiple=True
+        )
+        sg.send(message)
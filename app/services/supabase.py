@@ -1,6 +1,8 @@
 from typing import Optional
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from app.config import SUPABASE_URL, SUPABASE_KEY
+from app.services.resilience import STORE_DEADLINE_SECONDS
 
 _supabase_client: Optional[Client] = None
 
@@ -12,6 +14,10 @@ def get_supabase_client() -> Client:
         if not SUPABASE_URL or not SUPABASE_KEY:
             raise RuntimeError("Supabase environment variables not set")
 
-        _supabase_client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        _supabase_client = create_client(
+            SUPABASE_URL,
+            SUPABASE_KEY,
+            options=ClientOptions(postgrest_client_timeout=STORE_DEADLINE_SECONDS),
+        )
 
     return _supabase_client
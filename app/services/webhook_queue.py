@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+MAX_ATTEMPTS = 8
+MAX_BACKOFF_SECONDS = 300
+# A job held longer than this is assumed to belong to a dead worker.
+LEASE_SECONDS = 120
+DONE_RETENTION_SECONDS = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    webhook_id TEXT UNIQUE,
+    topic TEXT NOT NULL,
+    ordering_key TEXT NOT NULL,
+    payload BLOB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    available_at REAL NOT NULL,
+    locked_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS webhook_jobs_claim_idx ON webhook_jobs (status, available_at);
+CREATE INDEX IF NOT EXISTS webhook_jobs_ordering_idx ON webhook_jobs (ordering_key, id);
+"""
+
+# Oldest runnable job whose ordering key has no earlier unfinished job,
+# so events for one order are processed strictly in arrival order.
+CLAIM_SQL = """
+UPDATE webhook_jobs
+SET status = 'processing', locked_at = :now, attempts = attempts + 1
+WHERE id = (
+    SELECT j.id FROM webhook_jobs j
+    WHERE (
+        (j.status = 'pending' AND j.available_at <= :now)
+        OR (j.status = 'processing' AND j.locked_at <= :stale)
+    )
+    AND NOT EXISTS (
+        SELECT 1 FROM webhook_jobs p
+        WHERE p.ordering_key = j.ordering_key
+          AND p.id < j.id
+          AND p.status IN ('pending', 'processing')
+    )
+    ORDER BY j.id
+    LIMIT 1
+)
+RETURNING id, topic, ordering_key, payload, attempts
+"""
+
+
+def queue_enabled() -> bool:
+    """True when WEBHOOK_QUEUE_PATH points the webhook at a worker-pool queue.
+
+    The SQLite file must be shared by the webhook app and the worker pool,
+    so both have to run on the same persistent host.
+    """
+    return bool(os.getenv("WEBHOOK_QUEUE_PATH"))
+
+
+class WebhookQueue:
+    """Durable, SQLite-backed queue of raw Shopify webhook payloads."""
+
+    def __init__(self, path: str | None = None):
+        path = path or os.getenv("WEBHOOK_QUEUE_PATH")
+        if not path:
+            raise RuntimeError("Missing environment variable: WEBHOOK_QUEUE_PATH")
+
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(
+        self,
+        topic: str,
+        ordering_key: str,
+        payload: bytes,
+        webhook_id: str | None = None,
+    ) -> bool:
+        """Persist a payload; returns False if this webhook_id was already queued."""
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT OR IGNORE INTO webhook_jobs "
+            "(webhook_id, topic, ordering_key, payload, created_at, available_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (webhook_id, topic, ordering_key, payload, now, now),
+        )
+        return cursor.rowcount == 1
+
+    def claim(self) -> dict | None:
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                CLAIM_SQL, {"now": now, "stale": now - LEASE_SECONDS}
+            ).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        if row is None:
+            return None
+
+        job_id, topic, ordering_key, payload, attempts = row
+        return {
+            "id": job_id,
+            "topic": topic,
+            "ordering_key": ordering_key,
+            "payload": payload,
+            "attempts": attempts,
+        }
+
+    def complete(self, job_id: int) -> None:
+        self._connection().execute(
+            "UPDATE webhook_jobs SET status = 'done', finished_at = ?, last_error = NULL "
+            "WHERE id = ?",
+            (time.time(), job_id),
+        )
+
+    def fail(self, job_id: int, attempts: int, error: str) -> None:
+        """Schedule a retry with exponential backoff, or park the job as dead."""
+        now = time.time()
+        if attempts >= MAX_ATTEMPTS:
+            self._connection().execute(
+                "UPDATE webhook_jobs SET status = 'dead', finished_at = ?, last_error = ? "
+                "WHERE id = ?",
+                (now, error, job_id),
+            )
+            return
+
+        delay = min(2 ** attempts, MAX_BACKOFF_SECONDS)
+        self._connection().execute(
+            "UPDATE webhook_jobs SET status = 'pending', available_at = ?, "
+            "locked_at = NULL, last_error = ? WHERE id = ?",
+            (now + delay, error, job_id),
+        )
+
+    def purge_done(self, older_than: float = DONE_RETENTION_SECONDS) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM webhook_jobs WHERE status = 'done' AND finished_at < ?",
+            (time.time() - older_than,),
+        )
+        return cursor.rowcount
+
+    def stats(self, window: float = 300) -> dict:
+        """Queue depth per status and processing lag, for the dashboard."""
+        now = time.time()
+        conn = self._connection()
+
+        depth = {"pending": 0, "processing": 0, "done": 0, "dead": 0}
+        for status, count in conn.execute(
+            "SELECT status, COUNT(*) FROM webhook_jobs GROUP BY status"
+        ):
+            depth[status] = count
+
+        (oldest_pending,) = conn.execute(
+            "SELECT MIN(created_at) FROM webhook_jobs WHERE status = 'pending'"
+        ).fetchone()
+        avg_lag, max_lag, processed = conn.execute(
+            "SELECT AVG(finished_at - created_at), MAX(finished_at - created_at), COUNT(*) "
+            "FROM webhook_jobs WHERE status = 'done' AND finished_at >= ?",
+            (now - window,),
+        ).fetchone()
+
+        return {
+            "depth": depth,
+            "oldest_pending_age_seconds": round(now - oldest_pending, 3) if oldest_pending else 0,
+            "processed_last_window": processed,
+            "window_seconds": window,
+            "avg_lag_seconds": round(avg_lag, 3) if avg_lag is not None else None,
+            "max_lag_seconds": round(max_lag, 3) if max_lag is not None else None,
+        }
+
+
+_webhook_queue: Optional[WebhookQueue] = None
+
+
+def get_webhook_queue() -> WebhookQueue:
+    global _webhook_queue
+
+    if _webhook_queue is None:
+        _webhook_queue = WebhookQueue()
+
+    return _webhook_queue
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+from app.services.orders import LicenseNotFound, process_event
+from app.services.resilience import incr, is_store_fault, log_metrics, store_breaker
+from app.services.webhook_queue import WebhookQueue, get_webhook_queue
+
+WORKER_COUNT = int(os.getenv("WEBHOOK_WORKERS", "4"))
+POLL_INTERVAL_SECONDS = 0.5
+PURGE_INTERVAL_SECONDS = 300
+
+
+class WebhookWorkerPool:
+    """Threads that drain the webhook queue, retrying failed jobs with backoff."""
+
+    def __init__(
+        self,
+        queue: WebhookQueue | None = None,
+        workers: int = WORKER_COUNT,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+    ):
+        self.queue = queue or get_webhook_queue()
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def start(self) -> None:
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._run, name=f"webhook-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+
+    def run_once(self) -> bool:
+        """Process a single job; returns False if nothing was runnable."""
+        # Leave jobs queued rather than burn their retries against a dead store
+        if store_breaker.is_open():
+            return False
+
+        job = self.queue.claim()
+        if job is None:
+            return False
+
+        try:
+            process_event(job["topic"], json.loads(job["payload"]))
+        except LicenseNotFound as e:
+            # Expected while a related webhook is still in flight; not a store fault
+            self.queue.fail(job["id"], job["attempts"], str(e))
+        except Exception as e:
+            print(f"❌ Job {job['id']} ({job['topic']}) attempt {job['attempts']} failed: {e!r}")
+            # Only store outages pause the queue; a bad payload just fails its job
+            if is_store_fault(e):
+                store_breaker.record_failure()
+            incr("webhook_jobs.failed")
+            self.queue.fail(job["id"], job["attempts"], repr(e))
+        else:
+            store_breaker.record_success()
+            incr("webhook_jobs.processed")
+            self.queue.complete(job["id"])
+
+        return True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if not self.run_once():
+                    self._stop.wait(self.poll_interval)
+            except Exception as e:
+                # Queue errors (e.g. a locked database) must not kill the worker
+                print(f"❌ Webhook worker error: {e}")
+                self._stop.wait(self.poll_interval)
+
+
+def main() -> None:
+    pool = WebhookWorkerPool()
+    pool.start()
+    print(f"🟢 Webhook worker pool started ({pool.workers} workers)")
+
+    try:
+        while True:
+            time.sleep(PURGE_INTERVAL_SECONDS)
+            pool.queue.purge_done()
+            log_metrics("webhook_worker.periodic")
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+-- Subscription renewals and the scheduled expiry sweep.
+
+-- Constant defaults make these metadata-only changes: no table rewrite.
+create type license_status as enum ('inactive', 'active', 'full', 'expired');
+
+alter table licenses
+    add column if not exists status license_status not null default 'inactive',
+    add column if not exists subscription_contract_id text,
+    add column if not exists last_renewal_order_id text,
+    add column if not exists reminder_sent_at timestamptz;
+
+-- Licenses already past expiry are flagged by the sweep itself, a page at a
+-- time (mark_expired_licenses), rather than by one large UPDATE here.
+
+-- The sweep scans (expiry_date, id) ranges over licenses that still need work;
+-- expired rows fall out of the partial index so it stays small.
+create index if not exists licenses_expiry_sweep_idx
+    on licenses (expiry_date, id)
+    where status <> 'expired';
+
+-- Reminder pass: only rows still waiting for their reminder.
+create index if not exists licenses_reminder_sweep_idx
+    on licenses (expiry_date, id)
+    where status <> 'expired' and reminder_sent_at is null;
+
+create index if not exists licenses_subscription_contract_id_idx
+    on licenses (subscription_contract_id)
+    where subscription_contract_id is not null;
+
+create index if not exists licenses_order_id_idx
+    on licenses (order_id);
@@ -0,0 +1,56 @@
+-- Compact, trigger-maintained status projection so validate is a single
+-- indexed lookup of a few fixed-width columns.
+
+-- status itself is created as license_status by the renewals migration.
+-- seats_used stays NULL until the trigger or the backfill below has computed
+-- the projection for a row; readers fall back to the base columns until then.
+alter table licenses
+    add column if not exists seats_used smallint,
+    add column if not exists seats_max smallint,
+    add column if not exists expires_at bigint;
+
+create or replace function licenses_refresh_status() returns trigger as $$
+begin
+    new.seats_used := coalesce(cardinality(new.activated_devices), 0);
+    new.seats_max := coalesce(new.device_limit, 1);
+    new.expires_at := extract(epoch from new.expiry_date)::bigint;
+    new.status := case
+        when new.expiry_date is not null and new.expiry_date <= now() then 'expired'
+        when new.seats_used >= new.seats_max then 'full'
+        when new.is_activated then 'active'
+        else 'inactive'
+    end;
+    return new;
+end;
+$$ language plpgsql;
+
+create trigger licenses_refresh_status
+    before insert or update on licenses
+    for each row execute function licenses_refresh_status();
+
+-- Recompute the projection for existing rows in id-ranged batches, committing
+-- after each so the table is never rewritten or locked in one statement.
+-- Run once after this migration, outside a transaction block:
+--     call licenses_backfill_status();
+-- Until it finishes, untouched rows have seats_used NULL and validate/activate
+-- compute the projection from the base columns (app/services/license_status.py).
+create or replace procedure licenses_backfill_status(batch_size bigint default 10000)
+language plpgsql as $$
+declare
+    last_id bigint := 0;
+    max_id bigint;
+begin
+    select coalesce(max(id), 0) into max_id from licenses;
+    while last_id < max_id loop
+        update licenses set device_limit = device_limit
+        where id > last_id and id <= last_id + batch_size and seats_used is null;
+        last_id := last_id + batch_size;
+        commit;
+    end loop;
+end;
+$$;
+
+-- Validate reads only these columns, so serve it from the index alone.
+create unique index if not exists licenses_license_key_status_idx
+    on licenses (license_key)
+    include (status, seats_used, seats_max, expires_at, created_at);
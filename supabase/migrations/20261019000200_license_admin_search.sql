@@ -0,0 +1,9 @@
+-- Partial email / license key lookups for the admin search endpoint.
+
+create extension if not exists pg_trgm;
+
+create index if not exists licenses_customer_email_trgm_idx
+    on licenses using gin (customer_email gin_trgm_ops);
+
+create index if not exists licenses_license_key_trgm_idx
+    on licenses using gin (license_key gin_trgm_ops);
@@ -0,0 +1,6 @@
+-- Record license email delivery so a retried order webhook re-sends the key
+-- when the license exists but the email never went out. Nullable with no
+-- default, so adding it is metadata-only.
+
+alter table licenses
+    add column if not exists email_sent_at timestamptz;
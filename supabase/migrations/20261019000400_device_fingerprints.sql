@@ -0,0 +1,25 @@
+-- Activated devices are stored as 16-byte keyed BLAKE2b fingerprints in a
+-- bytea[] column (~20 bytes per element vs ~40 for a raw UUID in text[]).
+-- activated_devices keeps only legacy raw ids until they are moved, either on
+-- the license's next activation or by `python -m app.services.device_migration`.
+-- A constant default keeps this a metadata-only change.
+
+alter table licenses
+    add column if not exists device_fingerprints bytea[] not null default '{}';
+
+-- Seats count fingerprints plus any legacy ids not migrated yet.
+create or replace function licenses_refresh_status() returns trigger as $$
+begin
+    new.seats_used := coalesce(cardinality(new.device_fingerprints), 0)
+        + coalesce(cardinality(new.activated_devices), 0);
+    new.seats_max := coalesce(new.device_limit, 1);
+    new.expires_at := extract(epoch from new.expiry_date)::bigint;
+    new.status := case
+        when new.expiry_date is not null and new.expiry_date <= now() then 'expired'
+        when new.seats_used >= new.seats_max then 'full'
+        when new.is_activated then 'active'
+        else 'inactive'
+    end;
+    return new;
+end;
+$$ language plpgsql;
@@ -0,0 +1,55 @@
+import pytest
+
+from app.services.devices import (
+    DEVICE_HASH_BYTES,
+    add_device,
+    has_device,
+    hash_device_id,
+    merge_devices,
+)
+
+
+@pytest.fixture(autouse=True)
+def secret(monkeypatch):
+    monkeypatch.setenv("DEVICE_HASH_SECRET", "test-secret")
+
+
+def test_fingerprint_is_bytea_hex_of_16_bytes():
+    fingerprint = hash_device_id("device-1")
+
+    assert fingerprint.startswith("\\x")
+    assert len(bytes.fromhex(fingerprint[2:])) == DEVICE_HASH_BYTES
+
+
+def test_fingerprint_normalizes_and_depends_on_secret(monkeypatch):
+    fingerprint = hash_device_id("  Device-1 ")
+    assert fingerprint == hash_device_id("device-1")
+
+    monkeypatch.setenv("DEVICE_HASH_SECRET", "other-secret")
+    assert hash_device_id("device-1") != fingerprint
+
+
+def test_legacy_hex_looking_ids_are_hashed():
+    raw = "4c4c4544004a3910804bb7c04f4e3132"
+
+    devices = merge_devices([], [raw])
+
+    assert devices == [hash_device_id(raw)]
+    assert has_device(devices, hash_device_id(raw))
+
+
+def test_merge_dedupes_and_sorts():
+    existing = hash_device_id("a")
+
+    devices = merge_devices([existing.upper().replace("\\X", "\\x")], ["a", "b"])
+
+    assert devices == sorted({existing, hash_device_id("b")})
+
+
+def test_add_device_keeps_order():
+    devices = merge_devices([], ["a", "c"])
+    add_device(devices, hash_device_id("b"))
+
+    assert devices == sorted(devices)
+    assert all(has_device(devices, hash_device_id(name)) for name in "abc")
+    assert not has_device(devices, hash_device_id("d"))
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    ReadCache,
+    cached_read,
+    is_store_fault,
+    store_call,
+)
+
+
+class APIError(Exception):
+    """Stand-in for postgrest.APIError, which carries the error code."""
+
+    def __init__(self, code):
+        super().__init__(code)
+        self.code = code
+
+
+def fail_with(error):
+    def fn():
+        raise error
+    return fn
+
+
+@pytest.fixture
+def breaker():
+    return CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+
+
+@pytest.mark.parametrize(
+    "error, expected",
+    [
+        (ConnectionError(), True),
+        (DeadlineExceeded(), True),
+        (APIError("503"), True),
+        (APIError("PGRST000"), True),
+        (APIError("57014"), True),
+        (APIError("404"), False),
+        (APIError("PGRST116"), False),
+        (APIError("23505"), False),
+        (ValueError(), False),
+    ],
+)
+def test_is_store_fault(error, expected):
+    assert is_store_fault(error) is expected
+
+
+def test_breaker_opens_then_half_opens_then_closes(breaker):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            store_call(fail_with(ConnectionError()), breaker=breaker)
+    assert breaker.snapshot()["state"] == "open"
+
+    with pytest.raises(CircuitOpenError):
+        store_call(lambda: 1, breaker=breaker)
+
+    time.sleep(0.06)
+    assert store_call(lambda: 1, breaker=breaker) == 1
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0}
+
+
+def test_failed_probe_reopens(breaker):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            store_call(fail_with(ConnectionError()), breaker=breaker)
+
+    time.sleep(0.06)
+    with pytest.raises(ConnectionError):
+        store_call(fail_with(ConnectionError()), breaker=breaker)
+
+    assert breaker.snapshot()["state"] == "open"
+
+
+def test_half_open_admits_a_single_probe(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_caller_errors_do_not_trip_the_breaker(breaker):
+    for _ in range(3):
+        with pytest.raises(APIError):
+            store_call(fail_with(APIError("23505")), breaker=breaker)
+
+    assert breaker.snapshot() == {"state": "closed", "consecutive_failures": 0}
+
+
+def test_caller_error_releases_the_probe(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    with pytest.raises(APIError):
+        store_call(fail_with(APIError("PGRST116")), breaker=breaker)
+
+    assert breaker.snapshot()["state"] == "half_open"
+    assert breaker.allow()
+
+
+def test_deadline_counts_as_failure(breaker):
+    with pytest.raises(DeadlineExceeded):
+        store_call(lambda: time.sleep(0.2), deadline=0.02, breaker=breaker)
+
+    assert breaker.snapshot()["consecutive_failures"] == 1
+
+
+def test_hedge_wins_when_first_call_is_slow(breaker):
+    calls = []
+    lock = threading.Lock()
+
+    def read():
+        with lock:
+            calls.append(None)
+            attempt = len(calls)
+        if attempt == 1:
+            time.sleep(0.5)
+        return attempt
+
+    assert store_call(read, deadline=1, breaker=breaker, hedge_after=0.02) == 2
+    assert len(calls) == 2
+
+
+def test_no_hedge_when_first_call_is_fast(breaker):
+    calls = []
+
+    def read():
+        calls.append(None)
+        return "ok"
+
+    assert store_call(read, deadline=1, breaker=breaker, hedge_after=0.2) == "ok"
+    assert len(calls) == 1
+
+
+def test_cached_read_serves_last_value_while_store_is_down():
+    breaker = CircuitBreaker("cache-test", failure_threshold=1, reset_timeout=60)
+    cache = ReadCache()
+
+    def read(fn, key="key"):
+        return cached_read(key, fn, hedge_after=None, breaker=breaker, cache=cache)
+
+    assert read(lambda: "fresh") == "fresh"
+    assert read(fail_with(ConnectionError())) == "fresh"
+    assert breaker.snapshot()["state"] == "open"
+
+    with pytest.raises(CircuitOpenError):
+        read(lambda: "never", key="other")
+
+
+def test_cached_read_does_not_mask_caller_errors(breaker):
+    cache = ReadCache()
+    cache.put("key", "stale")
+
+    with pytest.raises(APIError):
+        cached_read("key", fail_with(APIError("42501")), hedge_after=None, breaker=breaker, cache=cache)
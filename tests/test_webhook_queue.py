@@ -0,0 +1,110 @@
+import pytest
+
+from app.services import webhook_queue
+from app.services.webhook_queue import (
+    LEASE_SECONDS,
+    MAX_ATTEMPTS,
+    WebhookQueue,
+    queue_enabled,
+)
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(webhook_queue.time, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    return WebhookQueue(str(tmp_path / "queue.db"))
+
+
+def test_missing_path_fails_on_first_use(monkeypatch):
+    monkeypatch.delenv("WEBHOOK_QUEUE_PATH", raising=False)
+
+    assert not queue_enabled()
+    with pytest.raises(RuntimeError, match="WEBHOOK_QUEUE_PATH"):
+        WebhookQueue()
+
+
+def test_duplicate_webhook_id_is_ignored(queue):
+    assert queue.enqueue("orders/create", "order:1", b"{}", webhook_id="w1")
+    assert not queue.enqueue("orders/create", "order:1", b"{}", webhook_id="w1")
+
+    assert queue.stats()["depth"]["pending"] == 1
+
+
+def test_same_key_is_blocked_until_earlier_job_finishes(queue):
+    queue.enqueue("orders/create", "order:1", b"first", webhook_id="w1")
+    queue.enqueue("subscription_contracts/create", "order:1", b"second", webhook_id="w2")
+    queue.enqueue("orders/create", "order:2", b"other", webhook_id="w3")
+
+    first = queue.claim()
+    other = queue.claim()
+    assert first["payload"] == b"first"
+    assert other["payload"] == b"other"
+    assert queue.claim() is None
+
+    queue.complete(first["id"])
+    assert queue.claim()["payload"] == b"second"
+
+
+def test_failed_job_backs_off_and_keeps_blocking_its_key(queue, clock):
+    queue.enqueue("orders/create", "order:1", b"first", webhook_id="w1")
+    queue.enqueue("orders/create", "order:1", b"second", webhook_id="w2")
+
+    job = queue.claim()
+    queue.fail(job["id"], job["attempts"], "boom")
+    assert queue.claim() is None
+
+    clock.now += 2 ** job["attempts"]
+    retried = queue.claim()
+    assert retried["id"] == job["id"]
+    assert retried["attempts"] == 2
+
+
+def test_job_is_dead_after_max_attempts_and_unblocks_its_key(queue):
+    queue.enqueue("orders/create", "order:1", b"first", webhook_id="w1")
+    queue.enqueue("orders/create", "order:1", b"second", webhook_id="w2")
+
+    job = queue.claim()
+    queue.fail(job["id"], MAX_ATTEMPTS, "boom")
+
+    assert queue.stats()["depth"]["dead"] == 1
+    assert queue.claim()["payload"] == b"second"
+
+
+def test_stale_lease_is_reclaimed(queue, clock):
+    queue.enqueue("orders/create", "order:1", b"first", webhook_id="w1")
+
+    job = queue.claim()
+    assert queue.claim() is None
+
+    clock.now += LEASE_SECONDS
+    reclaimed = queue.claim()
+    assert reclaimed["id"] == job["id"]
+    assert reclaimed["attempts"] == 2
+
+
+def test_stats_report_depth_and_lag(queue, clock):
+    queue.enqueue("orders/create", "order:1", b"{}", webhook_id="w1")
+    queue.enqueue("orders/create", "order:2", b"{}", webhook_id="w2")
+
+    clock.now += 4
+    queue.complete(queue.claim()["id"])
+    stats = queue.stats()
+
+    assert stats["depth"] == {"pending": 1, "processing": 0, "done": 1, "dead": 0}
+    assert stats["oldest_pending_age_seconds"] == 4
+    assert stats["avg_lag_seconds"] == 4
+    assert stats["processed_last_window"] == 1